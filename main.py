@@ -1,20 +1,31 @@
 import os
+import atexit
+import pathlib
 import logging
+import logging.handlers
+import contextlib
+import functools
+import html
+import queue
+import re
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
-from collections import defaultdict
-from telegram import Update, KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
-from telegram.constants import ParseMode
+from collections import OrderedDict, deque
+from telegram import Update, KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove, LinkPreviewOptions
+from telegram.constants import ParseMode, MessageLimit
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, ContextTypes,
-    filters, ChatJoinRequestHandler, ChatMemberHandler
+    filters, ChatJoinRequestHandler, ChatMemberHandler, Defaults, AIORateLimiter
 )
 from telegram.error import TelegramError
 import phonenumbers
-from phonenumbers import NumberParseException
 import aiosqlite  # Using aiosqlite for async database operations
-import signal
 import sys
+import time
+import weakref
 import asyncio
+from itertools import groupby
+from operator import itemgetter
 
 # --- Configuration ---
 # It's recommended to load these from a .env file or environment variables for security.
@@ -22,13 +33,32 @@ BOT_TOKEN = os.getenv('BOT_TOKEN')
 ADMIN_ID = int(os.getenv('ADMIN_ID', '0'))
 # Set this to your bot's username (without the '@')
 BOT_USERNAME = os.getenv('BOT_USERNAME', 'YourBotUsername') 
+# Public HTTPS base URL for webhook mode (e.g. https://bot.example.com). Leave unset to use polling.
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+PORT = int(os.getenv('PORT', '8443'))
+# Number of read-only SQLite connections lookups are spread across.
+DB_READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', '4'))
+# Only the update types the bot has handlers for; Telegram doesn't deliver the rest at all.
+ALLOWED_UPDATES = [Update.MESSAGE, Update.MY_CHAT_MEMBER, Update.CHAT_JOIN_REQUEST]
 
 # --- Logging Setup ---
 # A more detailed logging format can be helpful for debugging.
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - [%(funcName)s] - %(message)s',
-    level=logging.INFO
-)
+# Messages use lazy %-style arguments, so they are only formatted for records that are emitted.
+# Records are handed to a queue and written by a background thread, so a slow or blocking stderr
+# never stalls the event loop. QueueHandler.prepare still merges the message arguments and renders
+# any traceback on the calling thread; only the final formatting and the write happen on the listener.
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - [%(funcName)s] - %(message)s',
+    datefmt='%Y-%m-%dT%H:%M:%S'
+))
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+logging.getLogger().addHandler(logging.handlers.QueueHandler(_log_queue))
+logging.getLogger().setLevel(logging.INFO)
+_log_listener.start()
+# Stopping the listener drains the queue, so the final shutdown messages are not lost.
+atexit.register(_log_listener.stop)
 # Suppress noisy logs from the HTTPX library used by python-telegram-bot
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
@@ -36,27 +66,41 @@ logger = logging.getLogger(__name__)
 # --- Rate Limiter ---
 # This class helps prevent spam and abuse by limiting user actions.
 class RateLimiter:
-    def __init__(self):
-        # Using defaultdict with a default factory simplifies adding new users.
-        self.attempts = defaultdict(lambda: {'verification': [], 'join': [], 'message': []})
+    def __init__(self, max_users: int = 50_000):
+        # user_id -> {action: deque of attempt times}, least recently active user first.
+        self.attempts: OrderedDict[int, dict[str, deque]] = OrderedDict()
+        # Caps memory from one-off users; the least recently active user is forgotten first.
+        self.max_users = max_users
         self.limits = {
-            'verification': (3, timedelta(days=1)),    # 3 attempts per 24 hours
-            'join': (5, timedelta(days=1)),            # 5 attempts per 24 hours
-            'message': (20, timedelta(minutes=1)),     # 20 messages per minute
+            'verification': (3, timedelta(days=1).total_seconds()),    # 3 attempts per 24 hours
+            'join': (5, timedelta(days=1).total_seconds()),            # 5 attempts per 24 hours
+            'message': (20, timedelta(minutes=1).total_seconds()),     # 20 messages per minute
         }
 
+    def _user_attempts(self, user_id: int) -> dict[str, deque]:
+        attempts = self.attempts.get(user_id)
+        if attempts is None:
+            # Only the newest `limit` attempts can affect a decision, so each deque is capped there.
+            attempts = self.attempts[user_id] = {key: deque(maxlen=limit) for key, (limit, _) in self.limits.items()}
+            if len(self.attempts) > self.max_users:
+                self.attempts.popitem(last=False)
+        else:
+            self.attempts.move_to_end(user_id)
+        return attempts
+
     def _cleanup_and_check(self, user_id: int, key: str) -> bool:
         """Removes expired timestamps and checks if the user is within the limit."""
-        now = datetime.now()
         limit, window = self.limits[key]
-        # Filter out old timestamps
-        valid_attempts = [t for t in self.attempts[user_id][key] if now - t < window]
-        self.attempts[user_id][key] = valid_attempts
-        return len(valid_attempts) < limit
+        attempts = self._user_attempts(user_id)[key]
+        # Timestamps are in order, so expired ones are always at the front.
+        cutoff = time.monotonic() - window
+        while attempts and attempts[0] <= cutoff:
+            attempts.popleft()
+        return len(attempts) < limit
 
     def record_attempt(self, user_id: int, key: str):
         """Records a new timestamp for a user's action."""
-        self.attempts[user_id][key].append(datetime.now())
+        self._user_attempts(user_id)[key].append(time.monotonic())
 
     def can_verify(self, user_id: int) -> bool:
         return self._cleanup_and_check(user_id, 'verification')
@@ -67,164 +111,514 @@ class RateLimiter:
     def can_message(self, user_id: int) -> bool:
         return self._cleanup_and_check(user_id, 'message')
 
+# --- SQL Statements ---
+# Kept as module-level constants so every call passes the identical string and
+# sqlite3's per-connection statement cache can reuse the compiled statement.
+# Connection tuning applied once when the shared connection is opened. WAL lets reads
+# proceed during writes, NORMAL sync drops the per-commit fsync of the WAL, and the larger
+# page cache plus mmap keep the small, hot tables in memory. A commit that leaves more than
+# wal_autocheckpoint pages in the WAL runs a passive checkpoint, and journal_size_limit then
+# truncates the file, so a write burst doesn't leave a large WAL slowing down every read.
+_SQLITE_PRAGMAS = (
+    'journal_mode=WAL',
+    'synchronous=NORMAL',
+    'temp_store=MEMORY',
+    'cache_size=-64000',
+    'mmap_size=268435456',
+    'wal_autocheckpoint=1000',
+    'journal_size_limit=67108864',
+)
+# Timestamps are stored as INTEGER unix time (seconds; microseconds for spam_tracking).
+_SQL_SCHEMA = '''
+    BEGIN;
+    CREATE TABLE IF NOT EXISTS verified_users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        first_name TEXT,
+        phone_number INTEGER,
+        verified_date INTEGER,
+        is_banned BOOLEAN DEFAULT FALSE
+    );
+    CREATE TABLE IF NOT EXISTS join_requests (
+        user_id INTEGER,
+        chat_id INTEGER,
+        request_date INTEGER,
+        status TEXT DEFAULT 'pending',
+        PRIMARY KEY (user_id, chat_id)
+    );
+    CREATE TABLE IF NOT EXISTS managed_groups (
+        chat_id INTEGER PRIMARY KEY,
+        chat_title TEXT,
+        chat_type TEXT,
+        added_date INTEGER,
+        is_active BOOLEAN DEFAULT TRUE
+    );
+    CREATE TABLE IF NOT EXISTS spam_tracking (
+        user_id INTEGER,
+        incident_type TEXT,
+        incident_time INTEGER,
+        details TEXT,
+        PRIMARY KEY (user_id, incident_time)
+    );
+    -- verified_users needs no extra index: user_id is the rowid, which is already the fastest lookup.
+    CREATE INDEX IF NOT EXISTS idx_join_requests_status ON join_requests(status, chat_id);
+    COMMIT;
+'''
+# Phone numbers are stored as the E.164 digits in an INTEGER (639171234567), which takes
+# 8 bytes instead of a ~13-17 byte string. Databases created with a TEXT column are rebuilt
+# once at startup, stripping the '+' and separators the old formatted values contain.
+_SQL_GET_PHONE_COLUMN_TYPE = "SELECT type FROM pragma_table_info('verified_users') WHERE name = 'phone_number'"
+_SQL_MIGRATE_PHONE_TO_INTEGER = '''
+    BEGIN;
+    CREATE TABLE verified_users_new (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        first_name TEXT,
+        phone_number INTEGER,
+        verified_date INTEGER,
+        is_banned BOOLEAN DEFAULT FALSE
+    );
+    INSERT INTO verified_users_new
+    SELECT user_id, username, first_name,
+           CAST(REPLACE(REPLACE(REPLACE(phone_number, '+', ''), ' ', ''), '-', '') AS INTEGER),
+           verified_date, is_banned
+    FROM verified_users;
+    DROP TABLE verified_users;
+    ALTER TABLE verified_users_new RENAME TO verified_users;
+    COMMIT;
+'''
+# Databases written by older versions hold their timestamps as datetime text
+# in local time ('2024-01-01 12:00:00.123456'). They are converted to unix time once, tracked via
+# user_version; the 'utc' modifier shifts the local text to UTC before conversion.
+_SCHEMA_VERSION = 1
+_SQL_MIGRATE_TIMESTAMPS_TO_INTEGER = '''
+    BEGIN;
+    UPDATE verified_users SET verified_date = CAST(strftime('%s', verified_date, 'utc') AS INTEGER)
+        WHERE typeof(verified_date) = 'text';
+    UPDATE managed_groups SET added_date = CAST(strftime('%s', added_date, 'utc') AS INTEGER)
+        WHERE typeof(added_date) = 'text';
+    UPDATE join_requests SET request_date = CAST(strftime('%s', request_date, 'utc') AS INTEGER)
+        WHERE typeof(request_date) = 'text';
+    UPDATE OR IGNORE spam_tracking
+        SET incident_time = CAST(strftime('%s', incident_time, 'utc') AS INTEGER) * 1000000
+                            + CAST(substr(incident_time || '000000', 21, 6) AS INTEGER)
+        WHERE typeof(incident_time) = 'text';
+    PRAGMA user_version = 1;
+    COMMIT;
+'''
+# Current unix time computed by SQLite, for writes that are applied immediately.
+_SQL_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+_SQL_GET_VERIFIED_PHONE = 'SELECT phone_number FROM verified_users WHERE user_id = ? AND is_banned = FALSE'
+_SQL_GET_VERIFIED_USER_IDS = 'SELECT user_id FROM verified_users WHERE is_banned = FALSE'
+_SQL_GET_BANNED_USER_IDS = 'SELECT user_id FROM verified_users WHERE is_banned = TRUE'
+# Upserts update the existing row in place; INSERT OR REPLACE would delete and re-insert it.
+_SQL_ADD_VERIFIED_USER = f'''
+    INSERT INTO verified_users
+    (user_id, username, first_name, phone_number, verified_date, is_banned)
+    VALUES (?, ?, ?, ?, {_SQL_NOW}, FALSE)
+    ON CONFLICT(user_id) DO UPDATE SET
+        username = excluded.username,
+        first_name = excluded.first_name,
+        phone_number = excluded.phone_number,
+        verified_date = excluded.verified_date,
+        is_banned = FALSE
+'''
+_SQL_BAN_USER = 'UPDATE verified_users SET is_banned = TRUE WHERE user_id = ?'
+_SQL_ADD_MANAGED_GROUP = f'''
+    INSERT INTO managed_groups
+    (chat_id, chat_title, chat_type, added_date, is_active)
+    VALUES (?, ?, ?, {_SQL_NOW}, TRUE)
+    ON CONFLICT(chat_id) DO UPDATE SET
+        chat_title = excluded.chat_title,
+        chat_type = excluded.chat_type,
+        added_date = excluded.added_date,
+        is_active = TRUE
+'''
+_SQL_GET_MANAGED_GROUPS = 'SELECT chat_id, chat_title, chat_type FROM managed_groups WHERE is_active = TRUE'
+_SQL_RECORD_JOIN_REQUEST = '''
+    INSERT INTO join_requests (user_id, chat_id, request_date, status)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(user_id, chat_id) DO UPDATE SET
+        request_date = excluded.request_date,
+        status = excluded.status
+'''
+# OR IGNORE: incidents are flushed in batches, and a (practically impossible) duplicate key
+# must not roll back the rest of the batch.
+_SQL_LOG_SPAM_INCIDENT = '''
+    INSERT OR IGNORE INTO spam_tracking (user_id, incident_type, incident_time, details)
+    VALUES (?, ?, ?, ?)
+'''
+
 # --- Database Manager ---
 # CRITICAL FIX: Using `aiosqlite` for non-blocking database operations, which is
 # essential for an `asyncio`-based application like this bot. Using standard
 # `sqlite3` would block the entire bot.
 class DatabaseManager:
-    def __init__(self, db_path: str = "filipino_bot.db"):
+    __slots__ = (
+        'db_path', '_conn', '_read_conns', '_read_pool', '_read_pool_size', '_write_lock',
+        '_verified_ids',
+        '_managed_groups_cache', '_managed_groups_generation',
+        '_write_queue', '_writer_task', '_write_batch_size', '_write_batch_delay',
+    )
+
+    def __init__(self, db_path: str = "filipino_bot.db", read_pool_size: int = 4):
         self.db_path = db_path
+        # A single long-lived connection is reused for every query instead of
+        # opening a new one per call. It is opened in `init_database`.
+        self._conn: aiosqlite.Connection | None = None
+        # Pool of read-only connections for lookups. aiosqlite runs each connection on its
+        # own thread, so reads run in parallel and never queue behind a write batch, and WAL
+        # keeps them unblocked. Idle connections wait in `_read_pool`.
+        self._read_conns: list[aiosqlite.Connection] = []
+        self._read_pool: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._read_pool_size = read_pool_size
+        # Serializes write transactions so concurrent handlers don't commit each other's work.
+        self._write_lock = asyncio.Lock()
+        # IDs of all verified, non-banned users, loaded at startup and kept in step with every
+        # write, so `is_verified` never touches SQLite.
+        self._verified_ids: set[int] = set()
+        # Active managed groups, loaded on first use and dropped whenever a group is added.
+        # Groups change rarely, but the list is read on every verification and /groups.
+        self._managed_groups_cache: tuple | None = None
+        self._managed_groups_generation = 0
+        # Write-behind queue of (sql, params) for bookkeeping writes nobody reads back
+        # immediately. A background task commits them in batches, one fsync per batch.
+        self._write_queue: asyncio.Queue[tuple[str, tuple]] = asyncio.Queue()
+        self._writer_task: asyncio.Task | None = None
+        self._write_batch_size = 100
+        self._write_batch_delay = 0.05
+
+    @staticmethod
+    async def _connect(database: str, **kwargs) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(database, **kwargs)
+        conn.row_factory = aiosqlite.Row
+        for pragma in _SQLITE_PRAGMAS:
+            await conn.execute(f'PRAGMA {pragma}')
+        return conn
 
     async def init_database(self):
-        """Initializes the database schema."""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS verified_users (
-                    user_id INTEGER PRIMARY KEY,
-                    username TEXT,
-                    first_name TEXT,
-                    phone_number TEXT,
-                    verified_date TIMESTAMP,
-                    is_banned BOOLEAN DEFAULT FALSE
-                )
-            ''')
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS join_requests (
-                    user_id INTEGER,
-                    chat_id INTEGER,
-                    request_date TIMESTAMP,
-                    status TEXT DEFAULT 'pending',
-                    PRIMARY KEY (user_id, chat_id)
-                )
-            ''')
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS managed_groups (
-                    chat_id INTEGER PRIMARY KEY,
-                    chat_title TEXT,
-                    chat_type TEXT,
-                    added_date TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE
-                )
-            ''')
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS spam_tracking (
-                    user_id INTEGER,
-                    incident_type TEXT,
-                    incident_time TIMESTAMP,
-                    details TEXT,
-                    PRIMARY KEY (user_id, incident_time)
-                )
-            ''')
-            await db.commit()
-            logger.info("Database initialized successfully.")
+        """Opens the shared connections and initializes the database schema."""
+        self._conn = await self._connect(self.db_path)
+        await self._conn.executescript(_SQL_SCHEMA)
+        async with self._conn.execute(_SQL_GET_PHONE_COLUMN_TYPE) as cursor:
+            (phone_column_type,) = await cursor.fetchone()
+        if phone_column_type != 'INTEGER':
+            logger.info("Migrating verified_users.phone_number to INTEGER...")
+            await self._conn.executescript(_SQL_MIGRATE_PHONE_TO_INTEGER)
+        async with self._conn.execute('PRAGMA user_version') as cursor:
+            (schema_version,) = await cursor.fetchone()
+        if schema_version < _SCHEMA_VERSION:
+            logger.info("Migrating timestamps to unix time...")
+            await self._conn.executescript(_SQL_MIGRATE_TIMESTAMPS_TO_INTEGER)
+        async with self._conn.execute(_SQL_GET_VERIFIED_USER_IDS) as cursor:
+            self._verified_ids = {row[0] for row in await cursor.fetchall()}
+        # Opened after the schema exists, since a read-only connection cannot create it.
+        read_uri = f"{pathlib.Path(self.db_path).resolve().as_uri()}?mode=ro"
+        for _ in range(self._read_pool_size):
+            conn = await self._connect(read_uri, uri=True)
+            self._read_conns.append(conn)
+            self._read_pool.put_nowait(conn)
+        self._writer_task = asyncio.create_task(self._writer_loop())
+        logger.info("Database initialized successfully.")
+
+    async def close(self):
+        """Flushes queued writes and closes the shared connections. Safe to call more than once."""
+        if self._writer_task is not None:
+            # A writer that has already died would never drain the queue, so don't wait on it.
+            if not self._writer_task.done():
+                await self._write_queue.join()
+            self._writer_task.cancel()
+            self._writer_task = None
+        for conn in self._read_conns:
+            await conn.close()
+        self._read_conns.clear()
+        self._read_pool = asyncio.Queue()
+        if self._conn is not None:
+            # Fold the WAL back into the database and truncate it, so the next start has nothing to replay.
+            await self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            await self._conn.close()
+            self._conn = None
+
+    async def _write(self, sql: str, params: tuple = ()):
+        """Executes a single write statement in its own transaction on the shared connection."""
+        async with self._write_lock:
+            await self._conn.execute(sql, params)
+            await self._conn.commit()
+
+    @contextlib.asynccontextmanager
+    async def _reader(self):
+        """Borrows an idle read-only connection, waiting for one if all are busy."""
+        conn = await self._read_pool.get()
+        try:
+            yield conn
+        finally:
+            self._read_pool.put_nowait(conn)
+
+    def _enqueue_write(self, sql: str, params: tuple):
+        """Queues a write for the background writer instead of committing it right away."""
+        self._write_queue.put_nowait((sql, params))
+
+    async def _writer_loop(self):
+        """Drains the write queue in batches of up to `_write_batch_size` items or `_write_batch_delay` seconds."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._write_queue.get()]
+            deadline = loop.time() + self._write_batch_delay
+            while len(batch) < self._write_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._write_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._flush_writes(batch)
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+
+    async def _flush_writes(self, batch: list[tuple[str, tuple]]):
+        """Commits a batch of queued writes in one transaction, one executemany per distinct statement."""
+        # Each queued statement writes its own table, so only the order among writes of the same
+        # statement matters, and sorted() is stable. Interleaved join and spam writes therefore
+        # still collapse into a single executemany each.
+        key = itemgetter(0)
+        async with self._write_lock:
+            try:
+                for sql, items in groupby(sorted(batch, key=key), key=key):
+                    await self._conn.executemany(sql, [params for _, params in items])
+                await self._conn.commit()
+            except Exception as e:
+                # Any failure drops only this batch; the writer loop must keep running for the next one.
+                logger.error("Failed to flush %s queued writes: %s", len(batch), e)
+                try:
+                    await self._conn.rollback()
+                except Exception as e:
+                    logger.error("Failed to roll back queued writes: %s", e)
+
+    async def get_verified_phone(self, user_id: int) -> str | None:
+        """Returns the E.164 phone of a verified, non-banned user, or None without a query for anyone else."""
+        if user_id not in self._verified_ids:
+            return None
+        async with self._reader() as conn, conn.execute(_SQL_GET_VERIFIED_PHONE, (user_id,)) as cursor:
+            row = await cursor.fetchone()
+        return f"+{row[0]}" if row else None
 
     async def add_verified_user(self, user_id: int, username: str, first_name: str, phone_number: str):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute('''
-                INSERT OR REPLACE INTO verified_users 
-                (user_id, username, first_name, phone_number, verified_date, is_banned)
-                VALUES (?, ?, ?, ?, ?, FALSE)
-            ''', (user_id, username or "", first_name or "", phone_number, datetime.now()))
-            await db.commit()
-
-    async def is_verified(self, user_id: int) -> bool:
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute('SELECT 1 FROM verified_users WHERE user_id = ? AND is_banned = FALSE', (user_id,)) as cursor:
-                return await cursor.fetchone() is not None
-
-    async def get_user_phone(self, user_id: int) -> str | None:
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute('SELECT phone_number FROM verified_users WHERE user_id = ?', (user_id,)) as cursor:
-                row = await cursor.fetchone()
-                return row[0] if row else None
+        # phone_number is E.164 (+639171234567); only the digits are stored.
+        await self._write(_SQL_ADD_VERIFIED_USER, (user_id, username or "", first_name or "", int(phone_number[1:])))
+        self._verified_ids.add(user_id)
+
+    def is_verified(self, user_id: int) -> bool:
+        return user_id in self._verified_ids
+
+    async def get_banned_user_ids(self) -> set[int]:
+        async with self._reader() as conn, conn.execute(_SQL_GET_BANNED_USER_IDS) as cursor:
+            return {row[0] for row in await cursor.fetchall()}
 
     async def ban_user(self, user_id: int):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute('UPDATE verified_users SET is_banned = TRUE WHERE user_id = ?', (user_id,))
-            await db.commit()
+        await self._write(_SQL_BAN_USER, (user_id,))
+        self._verified_ids.discard(user_id)
 
     async def add_managed_group(self, chat_id: int, chat_title: str, chat_type: str):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute('''
-                INSERT OR REPLACE INTO managed_groups 
-                (chat_id, chat_title, chat_type, added_date, is_active)
-                VALUES (?, ?, ?, ?, TRUE)
-            ''', (chat_id, chat_title, chat_type, datetime.now()))
-            await db.commit()
-
-    async def get_managed_groups(self) -> list:
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute('SELECT chat_id, chat_title, chat_type FROM managed_groups WHERE is_active = TRUE') as cursor:
-                return await cursor.fetchall()
-
-    async def log_spam_incident(self, user_id: int, incident_type: str, details: str):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute('''
-                INSERT INTO spam_tracking (user_id, incident_type, incident_time, details)
-                VALUES (?, ?, ?, ?)
-            ''', (user_id, incident_type, datetime.now(), details))
-            await db.commit()
+        await self._write(_SQL_ADD_MANAGED_GROUP, (chat_id, chat_title, chat_type))
+        self._managed_groups_cache = None
+        self._managed_groups_generation += 1
+
+    async def get_managed_groups(self) -> tuple:
+        """Returns the active managed groups, served from memory after the first load."""
+        if self._managed_groups_cache is not None:
+            return self._managed_groups_cache
+        generation = self._managed_groups_generation
+        async with self._reader() as conn, conn.execute(_SQL_GET_MANAGED_GROUPS) as cursor:
+            groups = tuple(await cursor.fetchall())
+        if generation == self._managed_groups_generation:
+            self._managed_groups_cache = groups
+        return groups
+
+    def record_join_request(self, user_id: int, chat_id: int, status: str):
+        """Records the outcome of a join request. The write is batched by the background writer."""
+        # Stamped here rather than with _SQL_NOW, which would record when the batch was flushed.
+        self._enqueue_write(_SQL_RECORD_JOIN_REQUEST, (user_id, chat_id, int(time.time()), status))
+
+    def log_spam_incident(self, user_id: int, incident_type: str, details: str):
+        """Records a spam incident. Purely forensic, so the write is batched by the background writer."""
+        # incident_time is part of the primary key, so it keeps microsecond resolution
+        # (like the datetime it replaces) to avoid collisions between back-to-back incidents.
+        self._enqueue_write(_SQL_LOG_SPAM_INCIDENT, (user_id, incident_type, time.time_ns() // 1000, details))
 
 # --- Phone Number Verification ---
-class PhoneVerifier:
-    @staticmethod
-    def verify_phone_number(phone_number: str) -> dict:
-        """
-        Cleans and validates a phone number, specifically checking if it's a valid Philippine number.
-        The cleaning logic is enhanced to handle more common user input formats.
-        """
-        if not phone_number:
-            return {'is_filipino': False, 'is_valid': False, 'formatted_number': ''}
-            
-        try:
-            # Normalize the number: remove common separators and handle local formats
-            cleaned_number = ''.join(filter(str.isdigit, phone_number))
-            if len(cleaned_number) == 10 and cleaned_number.startswith('9'):
-                # Format: 9171234567 -> +639171234567
-                cleaned_number = f"+63{cleaned_number}"
-            elif len(cleaned_number) == 11 and cleaned_number.startswith('09'):
-                # Format: 09171234567 -> +639171234567
-                cleaned_number = f"+63{cleaned_number[1:]}"
-            elif len(cleaned_number) == 12 and cleaned_number.startswith('639'):
-                # Format: 639171234567 -> +639171234567
-                cleaned_number = f"+{cleaned_number}"
-            elif not phone_number.startswith('+'):
-                 # Add '+' if it's missing but looks like an international number
-                 cleaned_number = f"+{cleaned_number}"
-            else:
-                 cleaned_number = phone_number
-
-            parsed = phonenumbers.parse(cleaned_number)
-            is_valid = phonenumbers.is_valid_number(parsed)
-            is_ph = phonenumbers.region_code_for_number(parsed) == 'PH'
-
-            return {
-                'is_filipino': is_ph and is_valid,
-                'is_valid': is_valid,
-                'formatted_number': phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.INTERNATIONAL) if is_valid else phone_number,
-                'region': phonenumbers.region_code_for_number(parsed) if is_valid else 'Unknown'
-            }
-        except NumberParseException as e:
-            logger.warning(f"Phone number parsing failed for '{phone_number}': {e}")
-            return {'is_filipino': False, 'is_valid': False, 'formatted_number': phone_number, 'region': 'Error'}
+# Deletion table for the separators users and Telegram clients put in phone numbers,
+# including non-breaking spaces and the Unicode dashes some keyboards substitute for '-'.
+# A single `str.translate` pass is much cheaper than filtering character by character.
+_PHONE_STRIP = str.maketrans('', '', ' -().+\u00a0\u2010\u2011\u2012\u2013\u2014\u2212')
+# A Philippine mobile number with its separators stripped: 639XXXXXXXXX, 09XXXXXXXXX or
+# 9XXXXXXXXX. Telegram accounts are registered to mobile numbers, so anything else is
+# rejected without consulting phonenumbers. Group 1 is the national number.
+_PH_MOBILE_RE = re.compile(r'(?:63|0)?(9\d{9})')
+
+@dataclass(frozen=True)
+class PhoneVerification:
+    """Outcome of checking a phone number. Immutable, so cached instances can be shared."""
+    is_filipino: bool
+    is_valid: bool
+    formatted_number: str
+    # Canonical form (e.g. +639171234567) that is stored in the database.
+    e164_number: str = ''
+    region: str = 'Unknown'
+
+def verify_phone_number(phone_number: str) -> PhoneVerification:
+    """
+    Cleans and validates a phone number, specifically checking if it's a valid Philippine number.
+    The cleaning logic is enhanced to handle more common user input formats.
+    """
+    if not phone_number:
+        return PhoneVerification(is_filipino=False, is_valid=False, formatted_number='')
+
+    # Normalize the number: remove common separators and handle local formats
+    match = _PH_MOBILE_RE.fullmatch(phone_number.translate(_PHONE_STRIP))
+    if match is None:
+        # Cannot be a Philippine number, so skip the (expensive) phonenumbers parse entirely.
+        # Foreign numbers are not validated further and are reported as invalid.
+        return PhoneVerification(is_filipino=False, is_valid=False, formatted_number=phone_number)
+
+    # 9171234567 / 09171234567 / 639171234567 -> 9171234567
+    result = _verify_national_number(match.group(1))
+    if not result.is_valid:
+        # Report invalid numbers back exactly as the user entered them.
+        return replace(result, formatted_number=phone_number)
+    return result
+
+@functools.lru_cache(maxsize=4096)
+def _verify_national_number(national: str) -> PhoneVerification:
+    """
+    Checks a Philippine mobile number (e.g. 9171234567) against phonenumbers' metadata.
+    The regex has already established the country and shape, so the number is built directly
+    instead of going through `phonenumbers.parse`, and formatted by slicing.
+    """
+    parsed = phonenumbers.PhoneNumber(country_code=63, national_number=int(national))
+    # The region is known, so validate against the PH metadata directly instead of letting
+    # is_valid_number look the region up first.
+    if not phonenumbers.is_valid_number_for_region(parsed, 'PH'):
+        return PhoneVerification(is_filipino=False, is_valid=False, formatted_number=f"+63{national}")
+    return PhoneVerification(
+        is_filipino=True,
+        is_valid=True,
+        formatted_number=f"+63 {national[:3]} {national[3:6]} {national[6:]}",
+        e164_number=f"+63{national}",
+        region='PH'
+    )
+
+# --- Message Templates ---
+# Static message text is built once at import; handlers only fill in the dynamic fields.
+# Messages are sent as HTML, so user- or chat-supplied values must go through html.escape.
+VERIFICATION_TMPL = (
+    "🇵🇭 <b>Filipino Verification</b>\n\n"
+    "Hello {first_name}! To join our exclusive groups, we need to verify that you are from the Philippines.\n\n"
+    "Please tap the button below to share your phone number. This is a one-time verification."
+)
+VERIFICATION_SUCCESS_TMPL = (
+    "✅ <b>Verification Successful!</b> 🇵🇭\n\n"
+    "Welcome, {first_name}! You are now verified.\n\n"
+    "Generating your personal invite links..."
+)
+VERIFICATION_LINKS_TMPL = (
+    "Here are your personal, one-time-use invite links. Please do not share them.\n\n"
+    "{invite_links}"
+)
+VERIFICATION_FAILED_TMPL = (
+    "❌ <b>Verification Failed</b>\n\n"
+    "The number you provided (<code>{phone}</code>) does not appear to be a valid Philippine phone number. "
+    "Please try again with a +63 number."
+)
+NO_GROUPS_MSG = "❌ No managed groups found. Please ask the admin to configure the bot."
+BLOCKED_FROM_SERVICE_MSG = "❌ You are blocked from using this service."
+SHARE_OWN_CONTACT_MSG = "❌ Please share your own contact information using the button."
+BLOCKED_MSG = "❌ You are blocked."
+TOO_MANY_ATTEMPTS_MSG = "⚠️ You have made too many verification attempts and have been blocked."
+NOT_VERIFIED_MSG = "❌ You must be verified first. Please use the /start command."
+STATUS_BLOCKED_MSG = "Status: <b>BLOCKED</b> 🚫"
+STATUS_NOT_VERIFIED_MSG = " Status: <b>NOT VERIFIED</b> ❌\nUse /start to begin verification."
+ALREADY_VERIFIED_MSG = "✅ You are already verified! Use /groups to get new invite links."
+GROUPS_TMPL = "✅ Here are your new personal invite links:\n\n{invite_links}"
+STATUS_VERIFIED_TMPL = "✅ Status: <b>VERIFIED</b> 🇵🇭\nPhone on record: <code>{phone}</code>"
+JOIN_APPROVED_TMPL = "✅ Your request to join <b>{chat_title}</b> was automatically approved!"
+JOIN_VERIFY_PROMPT_TMPL = (
+    "👋 Hello! To join <b>{chat_title}</b>, you first need to verify your identity with me.\n\n"
+    "Please click here -&gt; /start to begin the one-time verification process."
+)
+INVITE_LINK_TMPL = "{icon} <b>{chat_title}</b>\n🔗 {invite_link}"
+# Icon shown next to each invite link, keyed by the stored chat type.
+CHAT_TYPE_ICONS = {'group': "👥", 'supergroup': "👥", 'channel': "📢"}
+INVITE_LINK_FAILED_TMPL = "❌ <b>{chat_title}</b> - Could not create an invite link. The bot might not have the correct permissions."
+ADMIN_NEW_VERIFIED_TMPL = (
+    "✅ <b>New Verified User</b>\n\n"
+    "<b>User:</b> {mention}\n"
+    "<b>ID:</b> <code>{user_id}</code>\n"
+    "<b>Phone:</b> <code>{phone}</code>"
+)
+ADMIN_USER_BLOCKED_TMPL = "🚫 <b>User Blocked</b>\n\nUser ID: <code>{user_id}</code>\nReason: {reason}"
+ADMIN_GROUP_REGISTERED_TMPL = (
+    "✅ <b>Auto-Registered Group</b>\n\nThe bot was made an admin with invite permissions in:\n"
+    "<b>Title:</b> {chat_title}\n"
+    "<b>ID:</b> <code>{chat_id}</code>"
+)
+ADMIN_PROMOTION_INCOMPLETE_TMPL = (
+    "⚠️ <b>Admin Promotion Incomplete</b>\n\nThe bot was made an admin in {chat_title} but lacks the "
+    "'Invite Users' permission, so it was not added to managed groups."
+)
+ADMIN_BOT_ERROR_TMPL = (
+    "🚨 <b>Bot Error</b>\n\n"
+    "An error occurred: <code>{error}</code>\n\n"
+    "Update: <code>{update}</code>"
+)
+
+# --- Keyboards ---
+# Telegram objects are immutable, so the same markup instances are shared by every reply.
+CONTACT_MARKUP = ReplyKeyboardMarkup(
+    [[KeyboardButton("📱 Share my Philippine Phone Number", request_contact=True)]],
+    one_time_keyboard=True,
+    resize_keyboard=True
+)
+REMOVE_KEYBOARD = ReplyKeyboardRemove()
 
 # --- Main Bot Logic ---
 class FilipinoBotManager:
+    __slots__ = (
+        'db', 'rate_limiter', 'spam_words', 'blocked_user_cache',
+        '_admin_buffer', '_admin_flush_event', '_admin_flush_interval', '_admin_flush_threshold',
+        '_admin_notifier_task', '_admin_notifier_stopping', '_user_locks',
+    )
+
     def __init__(self, db: DatabaseManager, limiter: RateLimiter):
         self.db = db
         self.rate_limiter = limiter
         # A simple set of words to detect potential spam.
         self.spam_words = {'spam', 'viagra', 'crypto', 'earn money', 'bit.ly', 'porn', 'xxx', 'loan'}
         self.blocked_user_cache = set()
+        # Routine admin notifications are buffered and sent as one combined message every
+        # few seconds (or as soon as enough pile up) instead of one message per event.
+        self._admin_buffer: list[str] = []
+        self._admin_flush_event = asyncio.Event()
+        self._admin_flush_interval = 5
+        self._admin_flush_threshold = 10
+        self._admin_notifier_task: asyncio.Task | None = None
+        self._admin_notifier_stopping = False
+        # Per-user locks, held only while in use; the weak mapping drops idle ones automatically.
+        self._user_locks: weakref.WeakValueDictionary[int, asyncio.Lock] = weakref.WeakValueDictionary()
+
+    def _user_lock(self, user_id: int) -> asyncio.Lock:
+        """Returns the lock serializing updates from one user. Callers must keep a reference while using it."""
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = self._user_locks[user_id] = asyncio.Lock()
+        return lock
 
     async def load_blocked_users(self):
         """Loads banned user IDs into a cache for faster checks."""
-        async with aiosqlite.connect(self.db.db_path) as db:
-            async with db.execute('SELECT user_id FROM verified_users WHERE is_banned = TRUE') as cursor:
-                rows = await cursor.fetchall()
-                self.blocked_user_cache = {row[0] for row in rows}
-        logger.info(f"Loaded {len(self.blocked_user_cache)} blocked users into cache.")
+        self.blocked_user_cache = await self.db.get_banned_user_ids()
+        logger.info("Loaded %s blocked users into cache.", len(self.blocked_user_cache))
 
     async def block_user(self, context: ContextTypes.DEFAULT_TYPE, user_id: int, reason: str):
         """Blocks a user, updates the database, and notifies the admin."""
@@ -232,151 +626,189 @@ class FilipinoBotManager:
             return
         self.blocked_user_cache.add(user_id)
         await self.db.ban_user(user_id)
-        await self.db.log_spam_incident(user_id, "block", reason)
-        logger.warning(f"User {user_id} blocked. Reason: {reason}")
-        try:
-            await context.bot.send_message(
-                ADMIN_ID,
-                f"🚫 **User Blocked**\n\nUser ID: `{user_id}`\nReason: {reason}",
-                parse_mode=ParseMode.MARKDOWN
-            )
-        except TelegramError as e:
-            logger.error(f"Failed to send admin notification about block: {e}")
+        self.db.log_spam_incident(user_id, "block", reason)
+        logger.warning("User %s blocked. Reason: %s", user_id, reason)
+        self.queue_admin_notification(ADMIN_USER_BLOCKED_TMPL.format(user_id=user_id, reason=reason))
+
+    # --- Admin Notifications ---
+
+    def queue_admin_notification(self, text: str):
+        """Buffers a notification for the admin; it is delivered with the next batch."""
+        self._admin_buffer.append(text)
+        if len(self._admin_buffer) >= self._admin_flush_threshold:
+            self._admin_flush_event.set()
+
+    def start_admin_notifier(self, bot):
+        """Starts the background task that delivers buffered admin notifications."""
+        self._admin_notifier_stopping = False
+        self._admin_notifier_task = asyncio.create_task(self._admin_notifier_loop(bot))
+
+    async def stop_admin_notifier(self, bot):
+        """Stops the background task and delivers whatever is still buffered."""
+        if self._admin_notifier_task is not None:
+            # Let the loop finish its current flush and exit instead of cancelling it, which
+            # would drop the notifications already taken out of the buffer.
+            self._admin_notifier_stopping = True
+            self._admin_flush_event.set()
+            await self._admin_notifier_task
+            self._admin_notifier_task = None
+        await self._flush_admin_notifications(bot)
+
+    async def _admin_notifier_loop(self, bot):
+        while not self._admin_notifier_stopping:
+            try:
+                await asyncio.wait_for(self._admin_flush_event.wait(), self._admin_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self._flush_admin_notifications(bot)
+
+    async def _flush_admin_notifications(self, bot):
+        """Sends buffered notifications, packing as many as fit into each message."""
+        self._admin_flush_event.clear()
+        if not self._admin_buffer:
+            return
+        pending, self._admin_buffer = self._admin_buffer, []
+        messages = [pending[0]]
+        for text in pending[1:]:
+            if len(messages[-1]) + len(text) + 2 > MessageLimit.MAX_TEXT_LENGTH:
+                messages.append(text)
+            else:
+                messages[-1] += "\n\n" + text
+        for message in messages:
+            try:
+                await bot.send_message(ADMIN_ID, message)
+            except TelegramError as e:
+                logger.error("Failed to send admin notifications: %s", e)
 
     async def generate_invite_links(self, context: ContextTypes.DEFAULT_TYPE, user_id: int) -> str:
         """Generates one-time invite links for all managed groups."""
         managed_groups = await self.db.get_managed_groups()
         if not managed_groups:
-            return "❌ No managed groups found. Please ask the admin to configure the bot."
-            
-        link_tasks = []
-        for group in managed_groups:
-            link_tasks.append(self._create_single_invite_link(context, group, user_id))
-            
-        results = await asyncio.gather(*link_tasks)
+            return NO_GROUPS_MSG
+
+        # Shared by every link in this batch rather than recomputed per group.
+        expire_date = datetime.now() + timedelta(days=1)
+        link_name = f"Invite for user {user_id}"
+        results = await asyncio.gather(
+            *(self._create_single_invite_link(context, group, link_name, expire_date) for group in managed_groups)
+        )
         return "\n\n".join(results)
 
-    async def _create_single_invite_link(self, context, group, user_id):
+    async def _create_single_invite_link(self, context, group, link_name, expire_date):
         """Helper to create an invite link for one group. Catches errors gracefully."""
         try:
             # creates_join_request should be True if you want to approve them via the bot
-            expire_date = datetime.now() + timedelta(days=1)
             invite_link = await context.bot.create_chat_invite_link(
                 chat_id=group['chat_id'],
                 member_limit=1,
-                name=f"Invite for user {user_id}",
+                name=link_name,
                 expire_date=expire_date
             )
-            group_type_icon = "👥" if group['chat_type'] == "group" else "📢"
-            return f"{group_type_icon} **{group['chat_title']}**\n🔗 {invite_link.invite_link}"
+            group_type_icon = CHAT_TYPE_ICONS.get(group['chat_type'], "👥")
+            return INVITE_LINK_TMPL.format(icon=group_type_icon, chat_title=html.escape(group['chat_title']), invite_link=invite_link.invite_link)
         except TelegramError as e:
-            logger.error(f"Failed to create invite link for {group['chat_title']} ({group['chat_id']}): {e}")
-            await context.bot.send_message(ADMIN_ID, f"Error creating invite for {group['chat_title']}: {e}")
-            return f"❌ **{group['chat_title']}** - Could not create an invite link. The bot might not have the correct permissions."
+            logger.error("Failed to create invite link for %s (%s): %s", group['chat_title'], group['chat_id'], e)
+            # Best-effort, so it goes out with the next admin batch instead of delaying the user's links.
+            self.queue_admin_notification(html.escape(f"Error creating invite for {group['chat_title']}: {e}"))
+            return INVITE_LINK_FAILED_TMPL.format(chat_title=html.escape(group['chat_title']))
 
     # --- Command Handlers ---
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
         if user.id in self.blocked_user_cache:
-            await update.message.reply_text("❌ You are blocked from using this service.")
+            await update.message.reply_text(BLOCKED_FROM_SERVICE_MSG)
             return
 
-        if await self.db.is_verified(user.id):
-            await update.message.reply_text(
-                "✅ You are already verified! Use /groups to get new invite links.",
-                reply_markup=ReplyKeyboardRemove()
-            )
+        if self.db.is_verified(user.id):
+            await update.message.reply_text(ALREADY_VERIFIED_MSG, reply_markup=REMOVE_KEYBOARD)
             return
         
-        verification_msg = (
-            f"🇵🇭 **Filipino Verification**\n\n"
-            f"Hello {user.first_name}! To join our exclusive groups, we need to verify that you are from the Philippines.\n\n"
-            f"Please tap the button below to share your phone number. This is a one-time verification."
-        )
-        contact_keyboard = [[KeyboardButton("📱 Share my Philippine Phone Number", request_contact=True)]]
-        contact_markup = ReplyKeyboardMarkup(contact_keyboard, one_time_keyboard=True, resize_keyboard=True)
-        await update.message.reply_text(verification_msg, reply_markup=contact_markup)
+        verification_msg = VERIFICATION_TMPL.format(first_name=html.escape(user.first_name))
+        await update.message.reply_text(verification_msg, reply_markup=CONTACT_MARKUP)
 
     async def contact_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
         contact = update.message.contact
         
         if not contact or contact.user_id != user.id:
-            await update.message.reply_text("❌ Please share your own contact information using the button.", reply_markup=ReplyKeyboardRemove())
+            await update.message.reply_text(SHARE_OWN_CONTACT_MSG, reply_markup=REMOVE_KEYBOARD)
             return
 
+        # One contact at a time per user, so a double-tap can't verify (and send links) twice.
+        async with self._user_lock(user.id):
+            await self._process_contact(update, context, user, contact)
+
+    async def _process_contact(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user, contact):
         if user.id in self.blocked_user_cache:
-            await update.message.reply_text("❌ You are blocked.", reply_markup=ReplyKeyboardRemove())
+            await update.message.reply_text(BLOCKED_MSG, reply_markup=REMOVE_KEYBOARD)
+            return
+
+        # Only verified Philippine numbers are ever stored, so there is nothing to re-check for
+        # an already verified user (and it shouldn't count against their verification attempts).
+        if self.db.is_verified(user.id):
+            await update.message.reply_text(ALREADY_VERIFIED_MSG, reply_markup=REMOVE_KEYBOARD)
             return
             
         if not self.rate_limiter.can_verify(user.id):
             await self.block_user(context, user.id, "Exceeded verification attempts")
-            await update.message.reply_text("⚠️ You have made too many verification attempts and have been blocked.", reply_markup=ReplyKeyboardRemove())
+            await update.message.reply_text(TOO_MANY_ATTEMPTS_MSG, reply_markup=REMOVE_KEYBOARD)
             return
         
         self.rate_limiter.record_attempt(user.id, 'verification')
-        phone_result = self.verifier.verify_phone_number(contact.phone_number)
+        phone_result = verify_phone_number(contact.phone_number)
 
-        if phone_result['is_filipino']:
-            await self.db.add_verified_user(user.id, user.username, user.first_name, phone_result['formatted_number'])
+        if phone_result.is_filipino:
+            await self.db.add_verified_user(user.id, user.username, user.first_name, phone_result.e164_number)
             
-            # Notify admin
-            await context.bot.send_message(
-                ADMIN_ID,
-                f"✅ **New Verified User**\n\n"
-                f"**User:** {user.mention_markdown()}\n"
-                f"**ID:** `{user.id}`\n"
-                f"**Phone:** `{phone_result['formatted_number']}`",
-                parse_mode=ParseMode.MARKDOWN
+            self.queue_admin_notification(
+                ADMIN_NEW_VERIFIED_TMPL.format(
+                    mention=user.mention_html(), user_id=user.id, phone=html.escape(phone_result.formatted_number)
+                )
             )
 
-            # Send links to user
-            invite_links = await self.generate_invite_links(context, user.id)
-            success_msg = (
-                f"✅ **Verification Successful!** 🇵🇭\n\n"
-                f"Welcome, {user.first_name}! You are now verified.\n\n"
-                f"Here are your personal, one-time-use invite links. Please do not share them.\n\n"
-                f"{invite_links}"
+            # Confirm right away and create the links meanwhile; they follow as a second message.
+            _, invite_links = await asyncio.gather(
+                update.message.reply_text(
+                    VERIFICATION_SUCCESS_TMPL.format(first_name=html.escape(user.first_name)), reply_markup=REMOVE_KEYBOARD
+                ),
+                self.generate_invite_links(context, user.id)
             )
-            await update.message.reply_text(success_msg, reply_markup=ReplyKeyboardRemove(), parse_mode=ParseMode.MARKDOWN)
+            await update.message.reply_text(VERIFICATION_LINKS_TMPL.format(invite_links=invite_links))
 
         else:
             await update.message.reply_text(
-                f"❌ **Verification Failed**\n\n"
-                f"The number you provided (`{phone_result['formatted_number']}`) does not appear to be a valid Philippine phone number. "
-                f"Please try again with a +63 number.",
-                reply_markup=ReplyKeyboardRemove()
+                VERIFICATION_FAILED_TMPL.format(phone=html.escape(phone_result.formatted_number)),
+                reply_markup=REMOVE_KEYBOARD
             )
-            await self.db.log_spam_incident(user.id, "invalid_phone", f"Provided: {phone_result['formatted_number']}")
+            self.db.log_spam_incident(user.id, "invalid_phone", f"Provided: {phone_result.formatted_number}")
 
     async def groups_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
         if user.id in self.blocked_user_cache:
-            await update.message.reply_text("❌ You are blocked.")
+            await update.message.reply_text(BLOCKED_MSG)
             return
 
-        if not await self.db.is_verified(user.id):
-            await update.message.reply_text("❌ You must be verified first. Please use the /start command.")
+        if not self.db.is_verified(user.id):
+            await update.message.reply_text(NOT_VERIFIED_MSG)
             return
 
         invite_links = await self.generate_invite_links(context, user.id)
         await update.message.reply_text(
-            f"✅ Here are your new personal invite links:\n\n{invite_links}",
-            parse_mode=ParseMode.MARKDOWN
+            GROUPS_TMPL.format(invite_links=invite_links)
         )
 
     async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
         if user.id in self.blocked_user_cache:
-            await update.message.reply_text("Status: **BLOCKED** 🚫")
+            await update.message.reply_text(STATUS_BLOCKED_MSG)
             return
         
-        if await self.db.is_verified(user.id):
-            phone = await self.db.get_user_phone(user.id)
-            await update.message.reply_text(f"✅ Status: **VERIFIED** 🇵🇭\nPhone on record: `{phone}`")
+        phone = await self.db.get_verified_phone(user.id)
+        if phone is not None:
+            await update.message.reply_text(STATUS_VERIFIED_TMPL.format(phone=phone))
         else:
-            await update.message.reply_text(" Status: **NOT VERIFIED** ❌\nUse /start to begin verification.")
+            await update.message.reply_text(STATUS_NOT_VERIFIED_MSG)
 
     # --- Admin and Event Handlers ---
 
@@ -386,99 +818,152 @@ class FilipinoBotManager:
         new_status = update.my_chat_member.new_chat_member
         
         if new_status.status == new_status.ADMINISTRATOR:
-            logger.info(f"Bot was promoted to admin in {chat.title} ({chat.id}).")
+            logger.info("Bot was promoted to admin in %s (%s).", chat.title, chat.id)
             # We check for can_invite_users permission specifically.
             if new_status.can_invite_users:
                 await self.db.add_managed_group(chat.id, chat.title, chat.type)
-                logger.info(f"Auto-registered group: {chat.title}")
-                await context.bot.send_message(
-                    ADMIN_ID,
-                    f"✅ **Auto-Registered Group**\n\nThe bot was made an admin with invite permissions in:\n"
-                    f"**Title:** {chat.title}\n"
-                    f"**ID:** `{chat.id}`"
+                logger.info("Auto-registered group: %s", chat.title)
+                self.queue_admin_notification(
+                    ADMIN_GROUP_REGISTERED_TMPL.format(chat_title=html.escape(chat.title), chat_id=chat.id)
                 )
             else:
-                 await context.bot.send_message(
-                    ADMIN_ID,
-                    f"⚠️ **Admin Promotion Incomplete**\n\nThe bot was made an admin in {chat.title} but lacks the 'Invite Users' permission, so it was not added to managed groups."
-                 )
+                self.queue_admin_notification(
+                    ADMIN_PROMOTION_INCOMPLETE_TMPL.format(chat_title=html.escape(chat.title))
+                )
         elif new_status.status in [new_status.MEMBER, new_status.LEFT, new_status.KICKED]:
             # If bot is demoted or removed, you might want to deactivate it in the DB.
-            logger.info(f"Bot was removed or demoted in {chat.title} ({chat.id}).")
+            logger.info("Bot was removed or demoted in %s (%s).", chat.title, chat.id)
 
     async def join_request_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handles new users trying to join a group where the bot is an admin."""
         join_request = update.chat_join_request
         user = join_request.from_user
-        chat = join_request.chat
+        # Requests from different users run concurrently; one user's requests are handled in order.
+        async with self._user_lock(user.id):
+            await self._process_join_request(context, user, join_request.chat)
 
+    async def _process_join_request(self, context: ContextTypes.DEFAULT_TYPE, user, chat):
         if user.id in self.blocked_user_cache:
             await context.bot.decline_chat_join_request(chat.id, user.id)
-            logger.info(f"Declined join request from blocked user {user.id} for chat {chat.id}")
+            self.db.record_join_request(user.id, chat.id, 'declined')
+            logger.info("Declined join request from blocked user %s for chat %s", user.id, chat.id)
             return
             
         if not self.rate_limiter.can_join(user.id):
+            self.db.log_spam_incident(user.id, "join_rate_limit", f"Chat: {chat.id}")
             await context.bot.decline_chat_join_request(chat.id, user.id)
-            await self.db.log_spam_incident(user.id, "join_rate_limit", f"Chat: {chat.id}")
-            logger.warning(f"Rate limited join request from {user.id} for chat {chat.id}")
+            self.db.record_join_request(user.id, chat.id, 'declined')
+            logger.warning("Rate limited join request from %s for chat %s", user.id, chat.id)
             return
             
         self.rate_limiter.record_attempt(user.id, 'join')
 
-        if await self.db.is_verified(user.id):
+        if self.db.is_verified(user.id):
             try:
                 await context.bot.approve_chat_join_request(chat.id, user.id)
-                logger.info(f"Auto-approved verified user {user.id} for chat {chat.id}")
-                await context.bot.send_message(user.id, f"✅ Your request to join **{chat.title}** was automatically approved!", parse_mode=ParseMode.MARKDOWN)
+                self.db.record_join_request(user.id, chat.id, 'approved')
+                logger.info("Auto-approved verified user %s for chat %s", user.id, chat.id)
+                await context.bot.send_message(user.id, JOIN_APPROVED_TMPL.format(chat_title=html.escape(chat.title)))
             except TelegramError as e:
-                logger.error(f"Failed to approve join request for {user.id}: {e}")
+                logger.error("Failed to approve join request for %s: %s", user.id, e)
         else:
             # User is not verified, prompt them to start verification.
-            try:
-                await context.bot.send_message(
+            # You can choose to decline immediately or leave it pending. Declining is cleaner.
+            # Both calls are independent, so they run concurrently and one failing doesn't skip the other.
+            prompt_result, decline_result = await asyncio.gather(
+                context.bot.send_message(
                     user.id,
-                    f"👋 Hello! To join **{chat.title}**, you first need to verify your identity with me.\n\n"
-                    f"Please click here -> /start to begin the one-time verification process.",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-                # You can choose to decline immediately or leave it pending. Declining is cleaner.
-                await context.bot.decline_chat_join_request(chat.id, user.id)
-            except TelegramError as e:
-                logger.warning(f"Could not send verification prompt to user {user.id}: {e}")
+                    JOIN_VERIFY_PROMPT_TMPL.format(chat_title=html.escape(chat.title))
+                ),
+                context.bot.decline_chat_join_request(chat.id, user.id),
+                return_exceptions=True
+            )
+            if isinstance(prompt_result, Exception):
+                logger.warning("Could not send verification prompt to user %s: %s", user.id, prompt_result)
+            if isinstance(decline_result, Exception):
+                logger.error("Failed to decline join request for %s: %s", user.id, decline_result)
+            else:
+                self.db.record_join_request(user.id, chat.id, 'declined')
                 
     async def error_handler(self, update: object, context: ContextTypes.DEFAULT_TYPE):
         """Log Errors caused by Updates."""
-        logger.error(f"Exception while handling an update: {context.error}", exc_info=context.error)
+        logger.error("Exception while handling an update: %s", context.error, exc_info=context.error)
         
         # Optionally, notify the admin about critical errors
         if isinstance(context.error, TelegramError):
             try:
                 await context.bot.send_message(
                     ADMIN_ID,
-                    f"🚨 **Bot Error**\n\n"
-                    f"An error occurred: `{context.error}`\n\n"
-                    f"Update: `{update}`"
+                    ADMIN_BOT_ERROR_TMPL.format(error=html.escape(str(context.error)), update=html.escape(str(update)))
                 )
             except Exception as e:
-                logger.error(f"Failed to send error notification to admin: {e}")
+                logger.error("Failed to send error notification to admin: %s", e)
 
 # --- Application Setup ---
-async def main():
+def main():
     """Main function to set up and run the bot."""
     if not all([BOT_TOKEN, ADMIN_ID, BOT_USERNAME]):
         logger.critical("FATAL: BOT_TOKEN, ADMIN_ID, and BOT_USERNAME environment variables must be set.")
         sys.exit(1)
+    if DB_READ_POOL_SIZE < 1:
+        # With no read connections every lookup would wait on the pool forever.
+        logger.critical("FATAL: DB_READ_POOL_SIZE must be at least 1, got %s.", DB_READ_POOL_SIZE)
+        sys.exit(1)
 
     # Initialize components
-    db_manager = DatabaseManager()
-    await db_manager.init_database()
-    
+    db_manager = DatabaseManager(read_pool_size=DB_READ_POOL_SIZE)
     rate_limiter = RateLimiter()
     bot_manager = FilipinoBotManager(db_manager, rate_limiter)
-    await bot_manager.load_blocked_users()
+
+    # --- Lifecycle Hooks ---
+    # The database connection is opened inside the application's event loop and
+    # closed only after all pending updates have been processed.
+    async def post_init(application: Application):
+        await db_manager.init_database()
+        await bot_manager.load_blocked_users()
+        bot_manager.start_admin_notifier(application.bot)
+        logger.info("Bot started successfully as @%s", BOT_USERNAME)
+
+    async def post_stop(application: Application):
+        logger.info("Stopping bot...")
+        await bot_manager.stop_admin_notifier(application.bot)
+
+    async def post_shutdown(application: Application):
+        await db_manager.close()
+        logger.info("Bot stopped.")
 
     # Build the application
-    application = Application.builder().token(BOT_TOKEN).build()
+    # HTML is the default parse mode for every outgoing message, link previews are off (the only
+    # links are invite links), and handlers don't block the update dispatcher.
+    defaults = Defaults(
+        parse_mode=ParseMode.HTML,
+        link_preview_options=LinkPreviewOptions(is_disabled=True),
+        block=False
+    )
+    # A larger HTTP connection pool keeps join storms (approve + notify per user) from
+    # stalling on "pool is full", and concurrent updates lets handlers run in parallel.
+    # Bot API calls use HTTP/2 so concurrent requests share one multiplexed connection;
+    # long-polling getUpdates stays on HTTP/1.1. The rate limiter keeps bursts under Telegram's
+    # overall 30 requests/s and retries requests that are still answered with RetryAfter. The
+    # per-group limiter is disabled (group_max_rate=0): PTB applies it to every call with a
+    # negative chat_id, so approve/decline/create_chat_invite_link for one group would share a
+    # 20-per-minute bucket, although Telegram's group limit only covers posting messages.
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .defaults(defaults)
+        .connection_pool_size(256)
+        .http_version("2")
+        .pool_timeout(30)
+        .get_updates_connection_pool_size(16)
+        .get_updates_pool_timeout(30)
+        .concurrent_updates(True)
+        .rate_limiter(AIORateLimiter(overall_max_rate=30, group_max_rate=0, max_retries=3))
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     # --- Add Handlers ---
     # Command Handlers
@@ -496,28 +981,22 @@ async def main():
     # Error Handler
     application.add_error_handler(bot_manager.error_handler)
 
-    # Start the bot
+    # Start the bot. run_webhook/run_polling drive initialize/start/stop/shutdown (and the
+    # hooks above) and stop cleanly on SIGINT/SIGTERM.
     logger.info("Starting bot...")
-    try:
-        await application.initialize()
-        await application.start()
-        await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
-        logger.info(f"Bot started successfully as @{BOT_USERNAME}")
-        
-        # Keep the script running
-        while True:
-            await asyncio.sleep(3600) # Sleep for an hour
-
-    except Exception as e:
-        logger.critical(f"Bot failed to start: {e}")
-    finally:
-        logger.info("Stopping bot...")
-        await application.stop()
-        await application.shutdown()
-        logger.info("Bot stopped.")
+    if WEBHOOK_URL:
+        # Telegram pushes updates to us, so there is no getUpdates long-polling round trip.
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=PORT,
+            url_path=BOT_TOKEN,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{BOT_TOKEN}",
+            allowed_updates=ALLOWED_UPDATES,
+            drop_pending_updates=True
+        )
+    else:
+        # Polling remains the fallback for local development.
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 if __name__ == '__main__':
-    try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        logger.info("Shutdown signal received.")
+    main()